@@ -1,5 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
-import pandas as pd
+import polars as pl
 from data_generation import generate_all_sap_data
 from optimizer import optimize_truckloads
 
@@ -16,18 +18,46 @@ def constraint_dropdown():
     value = st.number_input(f"Enter value for {constraint_label}", min_value=1.0, value=1000.0 if 'weight' in constraint_key else 100.0)
     return constraint_key, value
 
+def arrow_view(df: pl.DataFrame):
+    """Hand a frame to st.dataframe as zero-copy pyarrow-backed pandas."""
+    return df.to_pandas(use_pyarrow_extension_array=True)
+
+@st.cache_resource
+def solver_executor():
+    """Single background worker so a running solve survives Streamlit reruns."""
+    return ThreadPoolExecutor(max_workers=1)
+
+@st.cache_data(show_spinner=False)
+def mapping_csv(mapping):
+    """Serialize the sales-order/PO mapping once; reruns reuse the bytes."""
+    return mapping.write_csv().encode()
+
+@st.cache_data(show_spinner=False)
+def vbeln_totals(vbap):
+    """Per-sales-order weight/volume/pallet totals, computed once per dataset."""
+    return vbap.group_by('VBELN').agg(
+        pl.col('BRGEW').sum(),
+        pl.col('VOLUM').sum(),
+        pl.col('PALLET').sum()
+    )
+
 def show_utilization(assignments, sap_data, constraints, stage_label):
     """Show truck utilization table with percentages for weight, volume, and pallet."""
-    vbap = sap_data['VBAP']
-    merged = assignments.merge(vbap.groupby('VBELN').agg({'BRGEW':'sum','VOLUM':'sum','PALLET':'sum'}).reset_index(), on='VBELN')
-    util = merged.groupby('PO').agg({'BRGEW':'sum','VOLUM':'sum','PALLET':'sum'}).reset_index()
-    util['Weight Util %'] = 100 * util['BRGEW'] / constraints['max_weight']
-    util['Volume Util %'] = 100 * util['VOLUM'] / constraints['max_volume']
-    util['Pallet Util %'] = 100 * util['PALLET'] / constraints['max_pallets']
+    merged = assignments.join(vbeln_totals(sap_data['VBAP']), on='VBELN')
+    util = merged.group_by('PO').agg(
+        pl.col('BRGEW').sum(),
+        pl.col('VOLUM').sum(),
+        pl.col('PALLET').sum()
+    ).sort('PO').with_columns(
+        (100 * pl.col('BRGEW') / constraints['max_weight']).alias('Weight Util %'),
+        (100 * pl.col('VOLUM') / constraints['max_volume']).alias('Volume Util %'),
+        (100 * pl.col('PALLET') / constraints['max_pallets']).alias('Pallet Util %')
+    )
     st.write(f'{stage_label} Truck Utilization (% of constraint):')
-    st.dataframe(util[['PO','BRGEW','Weight Util %','VOLUM','Volume Util %','PALLET','Pallet Util %']])
-    avg = util[['Weight Util %','Volume Util %','Pallet Util %']].mean()
-    maxv = util[['Weight Util %','Volume Util %','Pallet Util %']].max()
+    st.dataframe(arrow_view(util.select('PO','BRGEW','Weight Util %','VOLUM','Volume Util %','PALLET','Pallet Util %')))
+    util_cols = ['Weight Util %','Volume Util %','Pallet Util %']
+    avg = util.select(util_cols).mean().row(0, named=True)
+    maxv = util.select(util_cols).max().row(0, named=True)
     st.write(f"Average {stage_label} Utilization: Weight {avg['Weight Util %']:.1f}%, Volume {avg['Volume Util %']:.1f}%, Pallet {avg['Pallet Util %']:.1f}%")
     st.write(f"Max {stage_label} Utilization: Weight {maxv['Weight Util %']:.1f}%, Volume {maxv['Volume Util %']:.1f}%, Pallet {maxv['Pallet Util %']:.1f}%")
     return avg, maxv
@@ -54,44 +84,46 @@ sap_data = generate_all_sap_data(num_orders=100, num_trucks=20)
 # Data preview
 st.subheader('Synthetic SAP Data Preview')
 with st.expander('VBAK (Order Header)'):
-    st.dataframe(sap_data['VBAK'].head())
+    st.dataframe(arrow_view(sap_data['VBAK'].head()))
 with st.expander('VBAP (Order Items)'):
-    st.dataframe(sap_data['VBAP'].head())
+    st.dataframe(arrow_view(sap_data['VBAP'].head()))
 with st.expander('VBPA (Partners)'):
-    st.dataframe(sap_data['VBPA'].head())
+    st.dataframe(arrow_view(sap_data['VBPA'].head()))
 with st.expander('VBKD (Business Data)'):
-    st.dataframe(sap_data['VBKD'].head())
+    st.dataframe(arrow_view(sap_data['VBKD'].head()))
 with st.expander('VBFA (Document Flow)'):
-    st.dataframe(sap_data['VBFA'].head())
+    st.dataframe(arrow_view(sap_data['VBFA'].head()))
 
 # Show mapping between sales orders and purchase orders
 st.subheader('Sales Order to Purchase Order Mapping (VBFA)')
-mapping_df = sap_data['VBFA'][['VBELN', 'VBELV']]
-st.dataframe(mapping_df)
-st.write(f"Total sales orders: {mapping_df['VBELN'].nunique()}")
-st.write(f"Total purchase orders: {mapping_df['VBELV'].nunique()}")
+mapping_df = sap_data['VBFA'].select('VBELN', 'VBELV')
+st.dataframe(arrow_view(mapping_df))
+st.write(f"Total sales orders: {mapping_df['VBELN'].n_unique()}")
+st.write(f"Total purchase orders: {mapping_df['VBELV'].n_unique()}")
 st.download_button(
     label="Download Mapping as CSV",
-    data=mapping_df.to_csv(index=False),
+    data=mapping_csv(mapping_df),
     file_name="sales_order_to_po_mapping.csv",
     mime="text/csv"
 )
 
 # Initial allocation (Initial Stage)
 st.subheader('Initial Stage: Allocation of Sales Orders to Trucks (POs)')
-initial_assignments = mapping_df.rename(columns={'VBELV': 'PO'})
-st.dataframe(initial_assignments)
+initial_assignments = mapping_df.rename({'VBELV': 'PO'})
+st.dataframe(arrow_view(initial_assignments))
 
 # Show initial truck utilization by pallets
 if 'max_pallets' in st.session_state['constraints']:
-    po_group = initial_assignments.groupby('PO')['VBELN'].apply(list).reset_index()
-    po_pallets = initial_assignments.merge(sap_data['VBAP'].groupby('VBELN').agg({'PALLET':'sum'}).reset_index(), on='VBELN')
-    po_pallets_sum = po_pallets.groupby('PO')['PALLET'].sum().reset_index()
-    initial_util = po_group.merge(po_pallets_sum, on='PO')
-    initial_util['Pallet Utilization (%)'] = 100 * initial_util['PALLET'] / st.session_state['constraints']['max_pallets']
-    initial_util['Sales Orders'] = initial_util['VBELN'].apply(lambda x: ', '.join(x))
+    initial_util = initial_assignments.join(
+        sap_data['VBAP'].select('VBELN', 'PALLET'), on='VBELN'
+    ).group_by('PO').agg(
+        pl.col('PALLET').sum(),
+        pl.col('VBELN').cast(pl.String).unique().sort().str.join(', ').alias('Sales Orders')
+    ).sort('PO').with_columns(
+        (100 * pl.col('PALLET') / st.session_state['constraints']['max_pallets']).alias('Pallet Utilization (%)')
+    )
     st.write('Initial Truck Utilization by Pallets (%):')
-    st.dataframe(initial_util[['PO', 'Sales Orders', 'PALLET', 'Pallet Utilization (%)']])
+    st.dataframe(arrow_view(initial_util.select('PO', 'Sales Orders', 'PALLET', 'Pallet Utilization (%)')))
 else:
     st.write('Set max pallets constraint to see initial truck utilization by pallets.')
 
@@ -99,18 +131,55 @@ else:
 if all(k in st.session_state['constraints'] for k in ['max_weight','max_volume','max_pallets']):
     avg_init, max_init = show_utilization(initial_assignments, sap_data, st.session_state['constraints'], 'Initial')
 else:
+    avg_init = max_init = None
     st.write('Set all constraints to see utilization percentages.')
 
-# Run optimizer
-if st.button('Run Optimization'):
-    if not all(k in st.session_state['constraints'] for k in ['max_weight','max_volume','max_pallets']):
-        st.error('Please add all three constraints (weight, volume, pallets) before running optimization.')
-    else:
+# Run optimizer; a fragment so polling for a running solve only re-renders
+# the panel, and a background thread so the UI stays responsive while CP-SAT
+# runs. While a job is pending the fragment is created with run_every so
+# Streamlit drives the polling itself; the full reruns triggered on submit
+# and completion re-create it with polling switched on or off.
+def optimization_panel(sap_data, avg_init, max_init):
+    constraints = dict(st.session_state['constraints'])
+    key = frozenset(constraints.items())
+    results = st.session_state.setdefault('opt_results', {})
+    if st.button('Run Optimization'):
+        if not all(k in constraints for k in ['max_weight','max_volume','max_pallets']):
+            st.error('Please add all three constraints (weight, volume, pallets) before running optimization.')
+            return
         st.info('The optimizer will only shuffle and move sales orders between the initial trucks (POs) to maximize utilization, subject to constraints. All sales orders in a PO will always stay together.')
-        assignments = optimize_truckloads(sap_data, st.session_state['constraints'])
-        avg_opt, max_opt = show_utilization(assignments, sap_data, st.session_state['constraints'], 'Optimized')
-        # Show improvement
-        st.write('---')
-        st.write('**Utilization Improvement (Optimized - Initial):**')
-        st.write(f"Average Weight: {avg_opt['Weight Util %']-avg_init['Weight Util %']:.1f}% | Volume: {avg_opt['Volume Util %']-avg_init['Volume Util %']:.1f}% | Pallet: {avg_opt['Pallet Util %']-avg_init['Pallet Util %']:.1f}%")
-        st.write(f"Max Weight: {max_opt['Weight Util %']-max_init['Weight Util %']:.1f}% | Volume: {max_opt['Volume Util %']-max_init['Volume Util %']:.1f}% | Pallet: {max_opt['Pallet Util %']-max_init['Pallet Util %']:.1f}%") 
\ No newline at end of file
+        # Solves are memoized per constraint set; only submit for a cache miss
+        if key not in results and 'opt_job' not in st.session_state:
+            st.session_state['opt_job'] = (key, solver_executor().submit(optimize_truckloads, sap_data, constraints))
+            st.rerun()
+
+    job = st.session_state.get('opt_job')
+    if job is not None:
+        job_key, future = job
+        if not future.done():
+            st.write('Optimizing...')
+            return
+        del st.session_state['opt_job']
+        try:
+            results[job_key] = future.result()
+        except ValueError as e:
+            results[job_key] = str(e)
+        st.rerun()
+
+    # Only show outcomes solved under the constraints currently in effect;
+    # solves for other constraint sets stay cached but are not displayed
+    assignments = results.get(key)
+    if assignments is None:
+        return
+    if isinstance(assignments, str):  # message from an infeasible solve
+        st.error(assignments)
+        return
+    avg_opt, max_opt = show_utilization(assignments, sap_data, constraints, 'Optimized')
+    # Show improvement
+    st.write('---')
+    st.write('**Utilization Improvement (Optimized - Initial):**')
+    st.write(f"Average Weight: {avg_opt['Weight Util %']-avg_init['Weight Util %']:.1f}% | Volume: {avg_opt['Volume Util %']-avg_init['Volume Util %']:.1f}% | Pallet: {avg_opt['Pallet Util %']-avg_init['Pallet Util %']:.1f}%")
+    st.write(f"Max Weight: {max_opt['Weight Util %']-max_init['Weight Util %']:.1f}% | Volume: {max_opt['Volume Util %']-max_init['Volume Util %']:.1f}% | Pallet: {max_opt['Pallet Util %']-max_init['Pallet Util %']:.1f}%")
+
+poll_every = 0.5 if 'opt_job' in st.session_state else None
+st.fragment(optimization_panel, run_every=poll_every)(sap_data, avg_init, max_init)
@@ -1,76 +1,79 @@
-import pandas as pd
+from datetime import date, timedelta
+
 import numpy as np
+import polars as pl
+import streamlit as st
 from typing import Tuple, Dict
 
-def generate_vbak(num_orders: int = 100) -> pd.DataFrame:
+# ID columns are dict-encoded Categoricals; a process-wide string cache keeps
+# the codes compatible across independently built frames so joins stay cheap
+pl.enable_string_cache()
+
+def generate_vbak(rng: np.random.Generator, num_orders: int = 100) -> pl.DataFrame:
     """Generate synthetic VBAK (Sales Order Header) data."""
     orders = [f"SO{1000+i}" for i in range(num_orders)]
-    order_types = np.random.choice(['OR', 'RE', 'ZOR'], num_orders)
-    dates = pd.date_range('2023-01-01', periods=num_orders, freq='D')
-    return pd.DataFrame({
+    order_types = rng.choice(np.array(['OR', 'RE', 'ZOR']), num_orders)
+    dates = pl.date_range(date(2023, 1, 1), date(2023, 1, 1) + timedelta(days=num_orders - 1), interval='1d', eager=True)
+    return pl.DataFrame({
         'VBELN': orders,
         'AUART': order_types,
         'ERDAT': dates
-    })
+    }).with_columns(pl.col('VBELN', 'AUART').cast(pl.Categorical))
 
-def generate_vbap(vbak: pd.DataFrame, max_items_per_order: int = 5) -> pd.DataFrame:
+def generate_vbap(rng: np.random.Generator, vbak: pl.DataFrame, max_items_per_order: int = 5) -> pl.DataFrame:
     """Generate synthetic VBAP (Sales Order Items) data with weight, volume, pallets."""
-    rows = []
-    for order in vbak['VBELN']:
-        num_items = np.random.randint(1, max_items_per_order+1)
-        for item in range(1, num_items+1):
-            material = f"MAT{np.random.randint(100,999)}"
-            qty = np.random.randint(1, 20)
-            weight = np.random.uniform(10, 200) * qty
-            volume = np.random.uniform(0.5, 5) * qty
-            pallets = np.random.randint(1, 4)
-            rows.append({
-                'VBELN': order,
-                'POSNR': f"{item:04d}",
-                'MATNR': material,
-                'KWMENG': qty,
-                'BRGEW': weight,
-                'VOLUM': volume,
-                'PALLET': pallets
-            })
-    return pd.DataFrame(rows)
+    num_items = rng.integers(1, max_items_per_order+1, size=len(vbak))
+    total = num_items.sum()
+    qty = rng.integers(1, 20, size=total)
+    return pl.DataFrame({
+        'VBELN': np.repeat(vbak['VBELN'].to_numpy(), num_items),
+        'POSNR': np.char.zfill(np.concatenate([np.arange(1, n+1) for n in num_items]).astype(str), 4),
+        'MATNR': np.char.add('MAT', rng.integers(100, 999, size=total).astype(str)),
+        'KWMENG': qty,
+        'BRGEW': rng.uniform(10, 200, size=total) * qty,
+        'VOLUM': rng.uniform(0.5, 5, size=total) * qty,
+        'PALLET': rng.integers(1, 4, size=total)
+    }).with_columns(pl.col('VBELN', 'MATNR').cast(pl.Categorical))
 
-def generate_vbpa(vbak: pd.DataFrame) -> pd.DataFrame:
+def generate_vbpa(rng: np.random.Generator, vbak: pl.DataFrame) -> pl.DataFrame:
     """Generate synthetic VBPA (Partner) data."""
-    partners = []
-    for order in vbak['VBELN']:
-        for func, prefix in [('AG', 'CUST'), ('WE', 'SHIP')]:
-            partners.append({
-                'VBELN': order,
-                'PARVW': func,
-                'KUNNR': f"{prefix}{np.random.randint(100,999)}"
-            })
-    return pd.DataFrame(partners)
+    num_orders = len(vbak)
+    return pl.DataFrame({
+        'VBELN': np.repeat(vbak['VBELN'].to_numpy(), 2),
+        'PARVW': np.tile(np.array(['AG', 'WE']), num_orders),
+        'KUNNR': np.char.add(np.tile(np.array(['CUST', 'SHIP']), num_orders),
+                             rng.integers(100, 999, size=2*num_orders).astype(str))
+    }).with_columns(pl.col('VBELN', 'PARVW', 'KUNNR').cast(pl.Categorical))
 
-def generate_vbkd(vbak: pd.DataFrame) -> pd.DataFrame:
+def generate_vbkd(rng: np.random.Generator, vbak: pl.DataFrame) -> pl.DataFrame:
     """Generate synthetic VBKD (Business Data) data."""
-    pricing = np.random.uniform(1000, 10000, len(vbak))
-    delivery_dates = vbak['ERDAT'] + pd.to_timedelta(np.random.randint(1, 10, len(vbak)), unit='D')
-    return pd.DataFrame({
-        'VBELN': vbak['VBELN'],
-        'NETWR': pricing,
-        'LFDAT': delivery_dates
-    })
+    pricing = rng.uniform(1000, 10000, len(vbak))
+    offsets = rng.integers(1, 10, len(vbak))
+    return vbak.with_columns(
+        pl.Series('NETWR', pricing),
+        pl.Series('_OFFSET', offsets)
+    ).select(
+        'VBELN',
+        'NETWR',
+        (pl.col('ERDAT') + pl.duration(days=pl.col('_OFFSET'))).alias('LFDAT')
+    )
 
-def generate_vbfa(vbak: pd.DataFrame, num_trucks: int = 20) -> pd.DataFrame:
+def generate_vbfa(rng: np.random.Generator, vbak: pl.DataFrame, num_trucks: int = 20) -> pl.DataFrame:
     """Generate synthetic VBFA (Document Flow) data linking POs (truckloads) to sales orders."""
     trucks = [f"PO{2000+i}" for i in range(num_trucks)]
-    assignments = np.random.choice(trucks, len(vbak))
-    return pd.DataFrame({
+    assignments = rng.choice(np.array(trucks), len(vbak))
+    return pl.DataFrame({
         'VBELV': assignments,  # PO number (truckload)
         'VBELN': vbak['VBELN']  # Sales order
-    })
+    }).with_columns(pl.col('VBELV').cast(pl.Categorical))
 
-def generate_all_sap_data(num_orders: int = 100, num_trucks: int = 20) -> Dict[str, pd.DataFrame]:
+@st.cache_data(show_spinner=False)
+def generate_all_sap_data(num_orders: int = 100, num_trucks: int = 20, seed: int = 42) -> Dict[str, pl.DataFrame]:
     """Generate all synthetic SAP tables and return as a dict of DataFrames."""
-    vbak = generate_vbak(num_orders)
-    vbap = generate_vbap(vbak)
-    vbpa = generate_vbpa(vbak)
-    vbkd = generate_vbkd(vbak)
-    vbfa = generate_vbfa(vbak, num_trucks)
-    return {'VBAK': vbak, 'VBAP': vbap, 'VBPA': vbpa, 'VBKD': vbkd, 'VBFA': vbfa} 
\ No newline at end of file
+    rng = np.random.default_rng(seed)
+    vbak = generate_vbak(rng, num_orders)
+    vbap = generate_vbap(rng, vbak)
+    vbpa = generate_vbpa(rng, vbak)
+    vbkd = generate_vbkd(rng, vbak)
+    vbfa = generate_vbfa(rng, vbak, num_trucks)
+    return {'VBAK': vbak, 'VBAP': vbap, 'VBPA': vbpa, 'VBKD': vbkd, 'VBFA': vbfa}
@@ -1,8 +1,63 @@
-import pandas as pd
-from typing import Dict, Any, List
-import pulp
+import os
 
-def optimize_truckloads(sap_data: Dict[str, pd.DataFrame], constraints: Dict[str, float]) -> pd.DataFrame:
+import numpy as np
+import polars as pl
+from numba import njit
+from typing import Dict, Any, List, Optional
+from ortools.sat.python import cp_model
+
+# CP-SAT works on integers; scale fractional weights/volumes to fixed point
+SCALE = 1000
+
+@njit(cache=True, fastmath=True)
+def _ffd_core(w, v, p, max_w, max_v, max_p, num_trucks):
+    """
+    Compiled first-fit loop: place each PO (already sorted decreasing) into
+    the first truck with remaining capacity. Returns the truck index per PO,
+    or -1 where no truck fits.
+    """
+    used_w = np.zeros(num_trucks)
+    used_v = np.zeros(num_trucks)
+    used_p = np.zeros(num_trucks)
+    out = np.full(len(w), -1, np.int32)
+    for i in range(len(w)):
+        for t in range(num_trucks):
+            if used_w[t] + w[i] <= max_w and used_v[t] + v[i] <= max_v and used_p[t] + p[i] <= max_p:
+                used_w[t] += w[i]
+                used_v[t] += v[i]
+                used_p[t] += p[i]
+                out[i] = t
+                break
+    return out
+
+def _ffd(po_totals: pl.DataFrame, constraints: Dict[str, float], num_trucks: int) -> Optional[Dict[Any, int]]:
+    """
+    First-fit-decreasing heuristic: sort POs by their tightest constraint ratio
+    and greedily place each into the first truck with remaining capacity.
+    Returns a dict mapping PO to truck index, or None if some PO does not fit.
+    """
+    max_w = constraints['max_weight']
+    max_v = constraints['max_volume']
+    max_p = constraints['max_pallets']
+    pos = po_totals['VBELV'].to_list()
+    w = np.ascontiguousarray(po_totals['BRGEW'].to_numpy(), dtype=np.float64)
+    v = np.ascontiguousarray(po_totals['VOLUM'].to_numpy(), dtype=np.float64)
+    p = np.ascontiguousarray(po_totals['PALLET'].to_numpy(), dtype=np.float64)
+    ratios = np.maximum.reduce([w / max_w, v / max_v, p / max_p])
+    order = np.argsort(-ratios)
+    placed = _ffd_core(w[order], v[order], p[order], max_w, max_v, max_p, num_trucks)
+    if (placed < 0).any():
+        return None
+    return {pos[i]: int(t) for i, t in zip(order, placed)}
+
+def _assignments_frame(vbfa: pl.DataFrame, chosen: Dict[Any, str]) -> pl.DataFrame:
+    """Broadcast a per-PO truck choice to every sales order via VBFA."""
+    return vbfa.select(
+        'VBELN',
+        pl.col('VBELV').cast(pl.String).replace_strict(chosen).cast(pl.Categorical).alias('PO')
+    )
+
+def optimize_truckloads(sap_data: Dict[str, pl.DataFrame], constraints: Dict[str, float]) -> pl.DataFrame:
     """
     Shuffle initial PO-to-sales order assignments among the same set of trucks (POs) to maximize utilization.
     A truck is considered used if any of its constraints (weight, volume, or pallet) is met first.
@@ -11,61 +66,109 @@ def optimize_truckloads(sap_data: Dict[str, pd.DataFrame], constraints: Dict[str
     """
     vbap = sap_data['VBAP']
     vbfa = sap_data['VBFA']
-    orders = vbap['VBELN'].unique()
-    trucks = vbfa['VBELV'].unique()
+    trucks = vbfa['VBELV'].cast(pl.String).unique().sort().to_list()
 
     # Aggregate order-level totals
-    order_totals = vbap.groupby('VBELN').agg({
-        'BRGEW': 'sum',
-        'VOLUM': 'sum',
-        'PALLET': 'sum'
-    }).reset_index()
-    order_totals = order_totals.set_index('VBELN')
+    order_totals = vbap.group_by('VBELN').agg(
+        pl.col('BRGEW').sum(),
+        pl.col('VOLUM').sum(),
+        pl.col('PALLET').sum()
+    )
+
+    # Aggregate PO-level totals once so constraint building only does dict lookups
+    po_totals = vbfa.join(order_totals, on='VBELN').group_by('VBELV').agg(
+        pl.col('BRGEW').sum(),
+        pl.col('VOLUM').sum(),
+        pl.col('PALLET').sum()
+    ).sort('VBELV')
+    po_list = po_totals['VBELV'].to_list()
+    scaled = (po_totals.select('BRGEW', 'VOLUM', 'PALLET').to_numpy() * SCALE).astype(np.int64)
+    po_weight = dict(zip(po_list, scaled[:, 0].tolist()))
+    po_volume = dict(zip(po_list, scaled[:, 1].tolist()))
+    po_pallet = dict(zip(po_list, scaled[:, 2].tolist()))
+    max_weight = int(constraints['max_weight'] * SCALE)
+    max_volume = int(constraints['max_volume'] * SCALE)
+    max_pallets = int(constraints['max_pallets'] * SCALE)
 
-    # Map each PO to its sales orders
-    po_to_orders = vbfa.groupby('VBELV')['VBELN'].apply(list).to_dict()
-    po_list = list(po_to_orders.keys())
+    # First-fit-decreasing solution, used as a fast path or a solver hint
+    heuristic = _ffd(po_totals, constraints, len(trucks))
+
+    # If FFD already meets the LP-relaxation lower bound on truck count, it is
+    # provably optimal and the solver can be skipped entirely
+    if heuristic is not None:
+        lower_bound = max(
+            np.ceil(po_totals['BRGEW'].sum() / constraints['max_weight']),
+            np.ceil(po_totals['VOLUM'].sum() / constraints['max_volume']),
+            np.ceil(po_totals['PALLET'].sum() / constraints['max_pallets'])
+        )
+        if len(set(heuristic.values())) <= lower_bound:
+            return _assignments_frame(vbfa, {po: trucks[i] for po, i in heuristic.items()})
 
     # Model
-    prob = pulp.LpProblem("TruckloadOptimization", pulp.LpMinimize)
+    model = cp_model.CpModel()
     # z[t] = 1 if truck t is used
-    z = pulp.LpVariable.dicts('used', (t for t in trucks), cat='Binary')
+    z = {t: model.NewBoolVar(f"used_{t}") for t in trucks}
     # assign[(po, t)] = 1 if PO po is assigned to truck t
-    assign = pulp.LpVariable.dicts('assign', ((po, t) for po in po_list for t in trucks), cat='Binary')
+    assign = {(po, t): model.NewBoolVar(f"assign_{po}_{t}") for po in po_list for t in trucks}
 
     # Each PO assigned to exactly one truck
     for po in po_list:
-        prob += pulp.lpSum([assign[(po, t)] for t in trucks]) == 1
+        model.AddExactlyOne(assign[(po, t)] for t in trucks)
 
-    # If a PO is assigned to a truck, that truck is used
+    # Channel an integer truck-index view of the assignment; CP-SAT has no
+    # dedicated bin-packing constraint, but the IntVar channel gives its
+    # propagators value-based pruning on top of the boolean encoding
+    bin_of = {po: model.NewIntVar(0, len(trucks) - 1, f"bin_{po}") for po in po_list}
     for po in po_list:
-        for t in trucks:
-            prob += assign[(po, t)] <= z[t]
+        for i, t in enumerate(trucks):
+            model.Add(bin_of[po] == i).OnlyEnforceIf(assign[(po, t)])
+
+    # If any PO is assigned to a truck, that truck is used (one aggregated
+    # constraint per truck instead of one per PO-truck pair)
+    for t in trucks:
+        model.Add(cp_model.LinearExpr.Sum([assign[(po, t)] for po in po_list]) <= len(po_list) * z[t])
+
+    # Trucks are interchangeable: break the symmetry by only allowing truck
+    # t+1 to be used if truck t is
+    trucks_sorted = list(trucks)
+    for i in range(len(trucks_sorted) - 1):
+        model.Add(z[trucks_sorted[i]] >= z[trucks_sorted[i + 1]])
 
-    # Truck constraints: sum over all orders in POs assigned to truck t
+    # Truck constraints: precomputed PO totals assigned to truck t, built as
+    # batched weighted sums rather than Python-level sums of products
+    weight_coeffs = [po_weight[po] for po in po_list]
+    volume_coeffs = [po_volume[po] for po in po_list]
+    pallet_coeffs = [po_pallet[po] for po in po_list]
     for t in trucks:
-        prob += pulp.lpSum([
-            sum(order_totals.loc[o, 'BRGEW'] for o in po_to_orders[po]) * assign[(po, t)]
-            for po in po_list
-        ]) <= constraints['max_weight'] * z[t]
-        prob += pulp.lpSum([
-            sum(order_totals.loc[o, 'VOLUM'] for o in po_to_orders[po]) * assign[(po, t)]
-            for po in po_list
-        ]) <= constraints['max_volume'] * z[t]
-        prob += pulp.lpSum([
-            sum(order_totals.loc[o, 'PALLET'] for o in po_to_orders[po]) * assign[(po, t)]
-            for po in po_list
-        ]) <= constraints['max_pallets'] * z[t]
+        vars_t = [assign[(po, t)] for po in po_list]
+        model.Add(cp_model.LinearExpr.WeightedSum(vars_t, weight_coeffs) <= max_weight * z[t])
+        model.Add(cp_model.LinearExpr.WeightedSum(vars_t, volume_coeffs) <= max_volume * z[t])
+        model.Add(cp_model.LinearExpr.WeightedSum(vars_t, pallet_coeffs) <= max_pallets * z[t])
 
     # Objective: minimize number of trucks used
-    prob += pulp.lpSum([z[t] for t in trucks])
+    model.Minimize(cp_model.LinearExpr.Sum([z[t] for t in trucks]))
 
-    prob.solve()
+    # Hint CP-SAT with the first-fit-decreasing solution; first-fit always
+    # fills the lowest-index trucks first, so it respects the z ordering above
+    if heuristic is not None:
+        used = set(heuristic.values())
+        for (po, t), var in assign.items():
+            model.AddHint(var, int(trucks_sorted[heuristic[po]] == t))
+        for po, i in heuristic.items():
+            model.AddHint(bin_of[po], i)
+        for i, t in enumerate(trucks_sorted):
+            model.AddHint(z[t], int(i in used))
 
-    assignments = []
-    for po in po_list:
-        for t in trucks:
-            if pulp.value(assign[(po, t)]) == 1:
-                for o in po_to_orders[po]:
-                    assignments.append({'VBELN': o, 'PO': t})
-    return pd.DataFrame(assignments) 
\ No newline at end of file
+    solver = cp_model.CpSolver()
+    solver.parameters.num_search_workers = os.cpu_count()
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        raise ValueError(
+            'No feasible truck assignment exists for the given constraints; '
+            'at least one PO exceeds the per-truck capacity or the fleet is too small.'
+        )
+
+    # The bin_of channel yields the chosen truck in one read per PO instead
+    # of scanning all P*T assignment literals
+    chosen = {po: trucks[solver.Value(bin_of[po])] for po in po_list}
+    return _assignments_frame(vbfa, chosen)